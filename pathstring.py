@@ -5,18 +5,370 @@
 
 """String class with path operations."""
 
+import errno
+import fnmatch
+import hashlib
+import io
+import marshal
 import os
 import pathlib
+import re
 import shutil
+import stat
+import struct
 import sys
-import types
+import threading
+import time
+from array import array
+from collections import deque, namedtuple
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
 from inspect import signature
-from itertools import dropwhile, zip_longest
+from itertools import dropwhile, islice, zip_longest
 
 
 __version__ = "2.0"
 
 
+DiskUsage = namedtuple("DiskUsage", ["apparent", "allocated"])
+DiskUsage.__doc__ = "Apparent and allocated sizes of a directory tree."
+
+Symlink = namedtuple("Symlink", ["target"])
+Symlink.__doc__ = "Target of a symbolic link in a tree specification."
+
+MaterializeStats = namedtuple("MaterializeStats",
+                              ["dirs", "files", "links", "elapsed"])
+MaterializeStats.__doc__ = "Counts and duration of a tree materialization."
+
+SyncSummary = namedtuple("SyncSummary",
+                         ["created", "copied", "deleted", "unchanged"])
+SyncSummary.__doc__ = "Relative paths of the entries handled by a sync."
+
+
+def _usage(st):
+    blocks = getattr(st, "st_blocks", None)
+    allocated = st.st_size if blocks is None else blocks * 512
+    return [st.st_size, allocated]
+
+
+def _entry_stat(entry, follow_symlinks=False):
+    st = entry.stat(follow_symlinks=follow_symlinks)
+    if st.st_ino == 0:
+        # device and inode numbers are not filled in on Windows
+        st = os.stat(entry.path, follow_symlinks=follow_symlinks)
+    return st
+
+
+def _scan_usage(path, follow_symlinks):
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    try:
+                        st = _entry_stat(entry, follow_symlinks)
+                    except OSError:
+                        st = _entry_stat(entry)
+                except OSError:
+                    continue
+                is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                entries.append((entry.path, st, is_dir))
+    except OSError:
+        pass
+    return entries
+
+
+def _iter_tree(root, onerror=None):
+    # Errors are raised unless a callback is given, which is then called
+    # with the error and the entry is skipped. The root is always needed.
+    stack = [""]
+    while len(stack) > 0:
+        rel = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, rel)) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            if (rel == "") or (onerror is None):
+                raise
+            onerror(e)
+            continue
+        subdirs = []
+        for entry in entries:
+            name = os.path.join(rel, entry.name)
+            try:
+                st = _entry_stat(entry)
+            except OSError as e:
+                if onerror is None:
+                    raise
+                onerror(e)
+                continue
+            yield name, st
+            if stat.S_ISDIR(st.st_mode):
+                subdirs.append(name)
+        stack.extend(reversed(subdirs))
+
+
+def _lookahead(items, size):
+    items = iter(items)
+    queue = deque(islice(items, size))
+    while len(queue) > 0:
+        yield queue.popleft()
+        queue.extend(islice(items, 1))
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+_PREFETCH_SIZE = 1 << 20
+
+
+def _write_tar(dest, mode, root, members):
+    import tarfile
+
+    with tarfile.open(dest, mode) as archive:
+        for rel, st, data in members:
+            info = archive.gettarinfo(os.path.join(root, rel), arcname=rel)
+            if info is None:
+                continue
+            if not info.isreg():
+                archive.addfile(info)
+            elif data is not None:
+                archive.addfile(info, io.BytesIO(data.result()))
+            else:
+                with open(os.path.join(root, rel), "rb") as f:
+                    archive.addfile(info, f)
+            # Hard links are detected through the inodes of the archive,
+            # the list of members is not needed when only writing.
+            archive.members.clear()
+
+
+def _write_zip(dest, root, members):
+    import zipfile
+
+    with zipfile.ZipFile(dest, "w", zipfile.ZIP_DEFLATED) as archive:
+        for rel, st, data in members:
+            path = os.path.join(root, rel)
+            arcname = rel.replace(os.sep, "/")
+            if stat.S_ISLNK(st.st_mode):
+                date_time = time.localtime(st.st_mtime)[:6]
+                info = zipfile.ZipInfo(arcname, date_time=date_time)
+                info.external_attr = st.st_mode << 16
+                archive.writestr(info, os.fsencode(os.readlink(path)))
+            elif stat.S_ISDIR(st.st_mode):
+                archive.writestr(zipfile.ZipInfo.from_file(path, arcname), b"")
+            elif stat.S_ISREG(st.st_mode):
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                if data is not None:
+                    archive.writestr(info, data.result())
+                    continue
+                with open(path, "rb") as f, archive.open(info, "w") as out:
+                    shutil.copyfileobj(f, out)
+
+
+def _is_inside(path, root):
+    return (path == root) or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def _check_member(dest, name, link=None, hard=False):
+    parts = name.split("/")
+    unsafe = name.startswith("/") or (os.pardir in parts)
+    if unsafe or os.path.splitdrive(name)[0]:
+        raise ValueError(f"Unsafe member '{name}'")
+    path = os.path.join(dest, *parts)
+    parent = os.path.realpath(os.path.dirname(path))
+    if not _is_inside(parent, dest):
+        raise ValueError(f"Unsafe member '{name}'")
+    if link is not None:
+        target = os.path.realpath(os.path.join(dest if hard else parent, link))
+        if os.path.isabs(link) or not _is_inside(target, dest):
+            raise ValueError(f"Unsafe link target '{link}'")
+    return path
+
+
+def _extract_zip(archive, dest):
+    import zipfile
+
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            if not stat.S_ISLNK(info.external_attr >> 16):
+                _check_member(dest, info.filename)
+                zf.extract(info, dest)
+                continue
+            target = os.fsdecode(zf.read(info))
+            link = _check_member(dest, info.filename, link=target)
+            os.makedirs(os.path.dirname(link), exist_ok=True)
+            os.symlink(target, link)
+
+
+def _extract_tar(archive, dest):
+    import tarfile
+
+    with tarfile.open(archive, "r|*") as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extraction_filter = tarfile.data_filter
+            tar.extractall(dest)
+            return
+        for member in tar:
+            if member.isdev():
+                raise ValueError(f"Unsafe member '{member.name}'")
+            link = None
+            if member.issym() or member.islnk():
+                link = member.linkname
+            _check_member(dest, member.name, link=link, hard=member.islnk())
+            member.mode &= 0o755
+            tar.extract(member, dest)
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def _translate_ignore_pattern(pattern):
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif (pattern[i] == "[") and ("]" in pattern[i + 2:]):
+            end = pattern.index("]", i + 2)
+            chars = pattern[i + 1:end].replace("\\", "\\\\")
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            regex.append(f"[{chars}]")
+            i = end + 1
+        elif (pattern[i] == "\\") and (i + 1 < len(pattern)):
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(regex))
+
+
+def _compile_ignore_rule(line, base=""):
+    line = line.rstrip("\r\n")
+    if not line.endswith("\\ "):
+        line = line.rstrip(" ")
+    if (not line) or line.startswith("#"):
+        return None
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith("\\"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    anchored = "/" in line
+    line = line.lstrip("/")
+    if not line:
+        return None
+    return _translate_ignore_pattern(line), negate, dir_only, anchored, base
+
+
+@lru_cache(maxsize=1024)
+def _load_ignore_rules(path, mtime_ns, base):
+    with open(path, encoding="utf-8", errors="surrogateescape") as f:
+        rules = [_compile_ignore_rule(line, base) for line in f]
+    return tuple(rule for rule in rules if rule is not None)
+
+
+def _glob_closure(states, patterns):
+    closure = set()
+    for i in states:
+        while (i < len(patterns)) and (patterns[i] == "**"):
+            closure.add(i)
+            i += 1
+        closure.add(i)
+    return frozenset(closure)
+
+
+def _glob_advance(states, patterns, name, is_link):
+    # Recursive wildcards do not follow symbolic links to directories,
+    # but the other components of a pattern do, as they do in rglob().
+    advanced = set()
+    for i in states:
+        if i == len(patterns):
+            continue
+        if patterns[i] == "**":
+            if not is_link:
+                advanced.add(i)
+        elif fnmatch.fnmatch(name, patterns[i]):
+            advanced.add(i + 1)
+    return _glob_closure(advanced, patterns)
+
+
+def _is_ignored(rel, name, is_dir, rules):
+    ignored = False
+    for regex, negate, dir_only, anchored, base in rules:
+        if dir_only and not is_dir:
+            continue
+        target = (rel[len(base) + 1:] if base else rel) if anchored else name
+        if regex.fullmatch(target):
+            ignored = not negate
+    return ignored
+
+
+_EDGE_SIZE = 1 << 12
+
+
+def _edge_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        digest.update(f.read(_EDGE_SIZE))
+        if os.fstat(f.fileno()).st_size > 2 * _EDGE_SIZE:
+            f.seek(-_EDGE_SIZE, os.SEEK_END)
+        digest.update(f.read())
+    return digest.digest()
+
+
+def _regroup(executor, groups, digest):
+    def try_digest(item):
+        try:
+            return digest(item[2])
+        except OSError:
+            return None
+
+    items = [(i, size, path)
+             for i, (size, paths) in enumerate(groups) for path in paths]
+    regrouped = {}
+    for (i, size, path), key in zip(items, executor.map(try_digest, items)):
+        if key is not None:
+            regrouped.setdefault((i, size, key), []).append(path)
+    return [(size, paths) for (_, size, _), paths in regrouped.items()
+            if len(paths) > 1]
+
+
+def _map_chunk(func, paths):
+    results = []
+    for path in paths:
+        try:
+            results.append(func(path))
+        except Exception as e:
+            e.path = path
+            if hasattr(e, "add_note"):
+                e.add_note(f"while processing '{path}'")
+            raise
+    return results
+
+
 def _make_path_type(name):
     def new_path(cls, *args):
         return str.__new__(cls, str(pathlib.Path(*args)))
@@ -24,7 +376,7 @@ def _make_path_type(name):
     def get_property(prop, *, as_path=False):
         def f(self):
             result = getattr(pathlib.Path(self), prop)
-            if isinstance(result, pathlib._PathParents):
+            if prop == "parents":
                 return (Path(p) for p in result)
             return result if not as_path else Path(result)
 
@@ -40,7 +392,7 @@ def _make_path_type(name):
                 self, *rest = args
                 args = (pathlib.Path(self),) + tuple(rest)
             result = m(*args, **kwargs)
-            if isinstance(result, types.GeneratorType):
+            if as_path and isinstance(result, Iterator):
                 return (Path(p) for p in result)
             return result if not as_path else Path(result)
 
@@ -66,9 +418,319 @@ def _make_path_type(name):
         down_path = Path(*[p for p in down_parts if p is not None])
         return Path(up_path, down_path)
 
+    def disk_usage(self, depth=None, workers=None, follow_symlinks=False,
+                   one_filesystem=True):
+        """Get the disk usage of every directory in the tree of this path.
+
+        Directories are scanned concurrently on a thread pool. Hard links
+        are counted only once. The totals of a directory include all entries
+        below it, but only directories up to the given depth are reported.
+        """
+        root = str(self)
+        top = os.stat(root)
+        seen = {(top.st_dev, top.st_ino)}
+        usage = {root: _usage(top)}
+        parents = {}
+        depths = {root: 0}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(_scan_usage, root, follow_symlinks)}
+            while len(pending) > 0:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for path, st, is_dir in future.result():
+                        if (st.st_dev, st.st_ino) in seen:
+                            continue
+                        seen.add((st.st_dev, st.st_ino))
+                        parent = os.path.dirname(path)
+                        if not is_dir:
+                            size, allocated = _usage(st)
+                            usage[parent][0] += size
+                            usage[parent][1] += allocated
+                            continue
+                        if one_filesystem and (st.st_dev != top.st_dev):
+                            continue
+                        usage[path] = _usage(st)
+                        parents[path] = parent
+                        depths[path] = depths[parent] + 1
+                        pending.add(executor.submit(_scan_usage, path,
+                                                    follow_symlinks))
+        for path in reversed(list(parents)):
+            usage[parents[path]][0] += usage[path][0]
+            usage[parents[path]][1] += usage[path][1]
+        return {
+            Path(path): DiskUsage(*totals)
+            for path, totals in usage.items()
+            if (depth is None) or (depths[path] <= depth)
+        }
+
+    def find_duplicates(self, workers=None):
+        """Find the groups of files with the same contents in the tree.
+
+        Files are grouped by their sizes from a single walk. Candidates
+        are then grouped by a digest of their first and last blocks,
+        and only the remaining ones are read fully. All reading is done
+        on a thread pool. Empty files are not reported, and neither are
+        multiple hard links to the same file. Directories that cannot be
+        listed are skipped.
+        """
+        root = str(self)
+        seen = set()
+        sizes = {}
+        for rel, st in _iter_tree(root, onerror=lambda e: None):
+            if (not stat.S_ISREG(st.st_mode)) or (st.st_size == 0):
+                continue
+            if (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            sizes.setdefault(st.st_size, []).append(os.path.join(root, rel))
+        groups = [(size, paths) for size, paths in sizes.items()
+                  if len(paths) > 1]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            groups = _regroup(executor, groups, _edge_digest)
+            small = [g for g in groups if g[0] <= 2 * _EDGE_SIZE]
+            large = [g for g in groups if g[0] > 2 * _EDGE_SIZE]
+            groups = small + _regroup(executor, large, _file_digest)
+        return sorted(sorted(Path(p) for p in paths) for _, paths in groups)
+
+    def map_files(self, func, pattern="*", processes=None, chunksize=64,
+                  ordered=False):
+        """Apply a function to the files in the tree on a process pool.
+
+        Files matching the pattern in any subdirectory are sent to
+        the worker processes in chunks, and pairs of paths and results
+        are generated as the chunks are completed. At most two chunks
+        per process are pending at any time. When the function fails,
+        the exception is raised with the failing path as its ``path``.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        paths = (p for p in self.rglob(pattern) if p.is_file())
+        limit = 2 * (processes or os.cpu_count() or 1)
+        pending = {}
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+
+            def fill():
+                while len(pending) < limit:
+                    chunk = list(islice(paths, chunksize))
+                    if len(chunk) == 0:
+                        break
+                    pending[executor.submit(_map_chunk, func, chunk)] = chunk
+
+            fill()
+            while len(pending) > 0:
+                if ordered:
+                    done = [next(iter(pending))]
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    yield from zip(chunk, future.result())
+                fill()
+
+    def sync_to(self, dest, delete=False, workers=None, checksum=False,
+                dry_run=False):
+        """Make a directory tree a mirror of the tree of this path.
+
+        Files and symbolic links are copied only if they differ in size
+        or modification time, or in content when checksums are enabled.
+        Copying and comparing are done on a thread pool. Entries that are
+        not in this tree are deleted from the destination if requested.
+        Nothing is changed if either tree cannot be listed completely.
+        """
+        source, dest = str(self), str(dest)
+        src_entries = dict(_iter_tree(source))
+        try:
+            dest_entries = dict(_iter_tree(dest))
+        except FileNotFoundError:
+            if os.path.lexists(dest):
+                raise
+            dest_entries = {}
+        created, deleted, gone = [], [], []
+
+        for rel in sorted(dest_entries, key=lambda r: r.split(os.sep)):
+            if any(rel.startswith(d + os.sep) for d in deleted[-1:]):
+                gone.append(rel)
+                continue
+            src_st, dst_st = src_entries.get(rel), dest_entries[rel]
+            if src_st is None:
+                if not delete:
+                    continue
+            elif stat.S_ISDIR(src_st.st_mode) == stat.S_ISDIR(dst_st.st_mode):
+                continue
+            deleted.append(rel)
+            if not dry_run:
+                if stat.S_ISDIR(dst_st.st_mode):
+                    shutil.rmtree(os.path.join(dest, rel))
+                else:
+                    os.unlink(os.path.join(dest, rel))
+        for rel in deleted + gone:
+            del dest_entries[rel]
+
+        def is_current(rel, src_st):
+            dst_st = dest_entries.get(rel)
+            if dst_st is None:
+                return False
+            if stat.S_IFMT(src_st.st_mode) != stat.S_IFMT(dst_st.st_mode):
+                return False
+            src, dst = os.path.join(source, rel), os.path.join(dest, rel)
+            if stat.S_ISLNK(src_st.st_mode):
+                return os.readlink(src) == os.readlink(dst)
+            if src_st.st_size != dst_st.st_size:
+                return False
+            if checksum:
+                return _file_digest(src) == _file_digest(dst)
+            return int(src_st.st_mtime) == int(dst_st.st_mtime)
+
+        def sync_entry(rel):
+            if is_current(rel, src_entries[rel]):
+                return False
+            if not dry_run:
+                dst = os.path.join(dest, rel)
+                if os.path.lexists(dst):
+                    os.unlink(dst)
+                shutil.copy2(os.path.join(source, rel), dst,
+                             follow_symlinks=False)
+            return True
+
+        if not dry_run:
+            os.makedirs(dest, exist_ok=True)
+        files = []
+        for rel, src_st in sorted(src_entries.items()):
+            if not stat.S_ISDIR(src_st.st_mode):
+                files.append(rel)
+            elif rel not in dest_entries:
+                created.append(rel)
+                if not dry_run:
+                    os.mkdir(os.path.join(dest, rel))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            copied = list(executor.map(sync_entry, files))
+
+        def as_paths(names):
+            return [Path(name) for name in names]
+
+        return SyncSummary(
+            created=as_paths(created),
+            copied=as_paths(f for f, c in zip(files, copied) if c),
+            deleted=as_paths(deleted),
+            unchanged=as_paths(f for f, c in zip(files, copied) if not c),
+        )
+
+    def rglob_ignoring(self, pattern="*", ignore_files=(".gitignore",),
+                       exclude=()):
+        """Search the tree recursively, skipping ignored entries.
+
+        Rules are read from the ignore files in every directory, using
+        the syntax of gitignore files, and the exclude patterns are applied
+        on top of them. Ignored directories are not listed at all. Paths
+        matching the pattern are generated as in ``rglob()``: recursive
+        wildcards do not follow symbolic links to directories, but the
+        other components of the pattern do.
+        """
+        top = "" if str(self) == os.curdir else str(self)
+        excludes = [_compile_ignore_rule(p) for p in exclude]
+        excludes = [rule for rule in excludes if rule is not None]
+        patterns = [p for p in pattern.replace(os.sep, "/").split("/")
+                    if p and (p != os.curdir)]
+        patterns = ["**"] + patterns
+        # Since Python 3.13 a trailing recursive wildcard matches files
+        # and links too.
+        recursive = patterns[-1] == "**"
+        dir_only = recursive and (sys.version_info < (3, 13))
+        states = _glob_closure({0}, patterns)
+        if (len(patterns) in states) and os.path.isdir(self):
+            yield self
+        stack = [("", (), states)]
+        while len(stack) > 0:
+            rel, rules, states = stack.pop()
+            dir_path = os.path.join(top, rel.replace("/", os.sep)) or "."
+            for ignore_file in ignore_files:
+                ignore_path = os.path.join(dir_path, ignore_file)
+                try:
+                    mtime = os.stat(ignore_path).st_mtime_ns
+                except OSError:
+                    continue
+                rules += _load_ignore_rules(ignore_path, mtime, rel)
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                is_dir = entry.is_dir(follow_symlinks=False)
+                ignored = _is_ignored(child, entry.name, is_dir, rules)
+                if ignored or _is_ignored(child, entry.name, is_dir, excludes):
+                    continue
+                is_link = entry.is_symlink()
+                child_states = _glob_advance(states, patterns, entry.name,
+                                             is_link)
+                matched = len(patterns) in child_states
+                if is_link and recursive and not dir_only:
+                    matched = matched or (len(patterns) - 1 in states)
+                is_dir = is_dir or (is_link and entry.is_dir())
+                if matched and (is_dir or not dir_only):
+                    child_path = os.path.join(top, child.replace("/", os.sep))
+                    yield str.__new__(Path, child_path)
+                if is_dir and (len(child_states) > 0):
+                    stack.append((child, rules, child_states))
+
+    def archive_to(self, dest, format="tar", workers=None):
+        """Write the tree of this path into an archive file.
+
+        The supported formats are ``tar``, ``tar.gz`` and ``zip``.
+        Members are written as the tree is walked, while small files
+        are read ahead on a thread pool. Only a bounded number of files
+        are kept in memory; large files are streamed from the disk.
+        The central directory of a zip file is kept in memory until it
+        is written, so it grows with the number of members.
+        """
+        if format not in ("tar", "tar.gz", "zip"):
+            raise ValueError(f"Unsupported archive format: '{format}'")
+        root = str(self)
+        size = 4 * (workers or min(32, (os.cpu_count() or 1) + 4))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+
+            def prefetch(rel, st):
+                if stat.S_ISREG(st.st_mode) and (st.st_size < _PREFETCH_SIZE):
+                    path = os.path.join(root, rel)
+                    return rel, st, executor.submit(_read_file, path)
+                return rel, st, None
+
+            members = (prefetch(rel, st) for rel, st in _iter_tree(root))
+            members = _lookahead(members, size)
+            if format == "zip":
+                _write_zip(dest, root, members)
+            else:
+                mode = "w|gz" if format == "tar.gz" else "w|"
+                _write_tar(dest, mode, root, members)
+
+    def extract_from(self, archive):
+        """Extract the members of an archive file into this directory.
+
+        Members that would be placed outside the directory, and links
+        that point outside of it, are rejected.
+        """
+        os.makedirs(self, exist_ok=True)
+        with open(archive, "rb") as f:
+            signature = f.read(4)
+        dest = os.path.realpath(self)
+        if signature in (b"PK\x03\x04", b"PK\x05\x06"):
+            _extract_zip(archive, dest)
+        else:
+            _extract_tar(archive, dest)
+
+    def opendir(self):
+        """Open this directory for operations relative to it."""
+        return DirHandle(self)
+
+    def reduce_path(self):
+        return _load_path, (str(self),)
+
     attrs = {}
 
     attrs["__new__"] = new_path
+    attrs["__reduce__"] = reduce_path
 
     for attr in [
         "anchor",
@@ -157,6 +819,14 @@ def _make_path_type(name):
             attrs[method] = meth
 
     attrs["relative_to"] = relative_to
+    attrs["archive_to"] = archive_to
+    attrs["disk_usage"] = disk_usage
+    attrs["extract_from"] = extract_from
+    attrs["find_duplicates"] = find_duplicates
+    attrs["map_files"] = map_files
+    attrs["opendir"] = opendir
+    attrs["rglob_ignoring"] = rglob_ignoring
+    attrs["sync_to"] = sync_to
     attrs["rmtree"] = shutil.rmtree
 
     return type(name, (str,), attrs)
@@ -164,3 +834,608 @@ def _make_path_type(name):
 
 Path = _make_path_type("Path")
 Path.__doc__ = "A path in the file system."
+
+
+class Resolver:
+    """Resolver for symbolic links that caches resolved prefixes.
+
+    Paths that share prefixes are resolved without repeating the system
+    calls for their common components. The cache is never refreshed
+    automatically, it has to be invalidated when the links change.
+    A resolver can be shared between threads.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self, prefix=None):
+        """Remove cached resolutions under a prefix, or all of them.
+
+        Since the targets of links elsewhere may go through the prefix,
+        all cached links are removed as well.
+        """
+        with self._lock:
+            self._generation += 1
+            if prefix is None:
+                self._cache.clear()
+                return
+            prefix = os.path.abspath(prefix)
+            under = prefix.rstrip(os.sep) + os.sep
+            for path, resolved in list(self._cache.items()):
+                is_link = path != resolved
+                if is_link or (path == prefix) or path.startswith(under):
+                    del self._cache[path]
+
+    def resolve(self, path, strict=False):
+        """Make the path absolute, resolving any symbolic links."""
+        if os.name == "nt":
+            return Path(pathlib.Path(path).resolve(strict=strict))
+        path = os.fspath(path)
+        if not os.path.isabs(path):
+            path = os.path.join(os.getcwd(), path)
+        generation = self._generation
+        resolved = self._join(os.sep, path, strict, set(), generation)
+        return str.__new__(Path, resolved)
+
+    def _store(self, path, resolved, generation):
+        with self._lock:
+            if generation == self._generation:
+                self._cache[path] = resolved
+
+    def _join(self, resolved, rest, strict, seen, generation):
+        if os.path.isabs(rest):
+            resolved = os.sep
+        names = [n for n in rest.split(os.sep) if n and (n != os.curdir)]
+        for i, name in enumerate(names):
+            if name == os.pardir:
+                resolved = os.path.dirname(resolved)
+                continue
+            path = os.path.join(resolved, name)
+            cached = self._cache.get(path)
+            final = strict and (i == len(names) - 1)
+            if (cached is not None) and (not final):
+                resolved = cached
+                continue
+            try:
+                st = os.lstat(path)
+            except OSError:
+                if strict:
+                    raise
+                resolved = path
+                continue
+            if not stat.S_ISLNK(st.st_mode):
+                if stat.S_ISDIR(st.st_mode):
+                    self._store(path, path, generation)
+                resolved = path
+                continue
+            if path in seen:
+                if sys.version_info < (3, 13):
+                    raise RuntimeError(f"Symlink loop from {path!r}")
+                if strict:
+                    message = os.strerror(errno.ELOOP)
+                    raise OSError(errno.ELOOP, message, path)
+                resolved = path
+                continue
+            seen.add(path)
+            target = os.readlink(path)
+            resolved = self._join(resolved, target, strict, seen, generation)
+            seen.discard(path)
+            if os.path.lexists(resolved):
+                self._store(path, resolved, generation)
+        return resolved
+
+
+def resolve_many(paths, strict=False, resolver=None):
+    """Resolve multiple paths, sharing the work for common prefixes."""
+    if resolver is None:
+        resolver = Resolver()
+    return [resolver.resolve(path, strict=strict) for path in paths]
+
+
+def _scan_listing(path):
+    subdirs, others = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            else:
+                others.append(entry.name)
+    mtime = os.stat(path).st_mtime_ns
+    return mtime, tuple(sorted(subdirs)), tuple(sorted(others))
+
+
+class TreeIndex:
+    """Index of the directory listings in a tree, kept in a file.
+
+    Listings and glob queries are answered from the index without
+    accessing the file system. The index can be refreshed by checking
+    the modification times of the directories, in which case only
+    the changed directories will be listed again. Symbolic links are
+    listed but not followed. Queries always see a consistent snapshot
+    of the index, even while it is being refreshed in another thread.
+    """
+
+    _header = b"pathstring-index:%d:%s\n" % (
+        marshal.version, sys.implementation.cache_tag.encode("ascii")
+    )
+
+    def __init__(self, root, filename, dirs):
+        self.root = Path(os.path.abspath(root))
+        self.filename = filename
+        self._dirs = dirs
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, root, filename):
+        """Build the index for a tree and save it to a file."""
+        index = cls(root, filename, {})
+        index._scan_tree(index._dirs, "")
+        index.save()
+        return index
+
+    @classmethod
+    def load(cls, filename):
+        """Load an index from a file."""
+        with open(filename, "rb") as f:
+            data = f.read()
+        if not data.startswith(cls._header):
+            raise ValueError(f"'{filename}' is not a compatible index file")
+        root, dirs = marshal.loads(data[len(cls._header):])
+        return cls(root, filename, dirs)
+
+    def save(self):
+        """Save the index to its file."""
+        with self._lock:
+            temp = f"{self.filename}.tmp"
+            with open(temp, "wb") as f:
+                f.write(self._header)
+                f.write(marshal.dumps((str(self.root), self._dirs)))
+            os.replace(temp, self.filename)
+
+    def refresh(self):
+        """Update the listings of the directories that have changed."""
+        with self._lock:
+            dirs = dict(self._dirs)
+            changed = []
+            for rel in list(dirs):
+                listing = dirs.get(rel)
+                if listing is None:
+                    continue
+                try:
+                    mtime = os.stat(self._path(rel)).st_mtime_ns
+                except OSError:
+                    self._drop(dirs, rel)
+                    continue
+                if mtime == listing[0]:
+                    continue
+                dirs[rel] = _scan_listing(self._path(rel))
+                old_subdirs, new_subdirs = set(listing[1]), set(dirs[rel][1])
+                for name in old_subdirs - new_subdirs:
+                    self._drop(dirs, os.path.join(rel, name))
+                for name in new_subdirs - old_subdirs:
+                    self._scan_tree(dirs, os.path.join(rel, name))
+                changed.append(self._path(rel))
+            self._dirs = dirs
+        return changed
+
+    def listdir(self, path=None):
+        """Get the paths of the entries in a directory of the tree."""
+        rel = "" if path is None else os.path.relpath(path, self.root)
+        if rel == os.curdir:
+            rel = ""
+        listing = self._dirs.get(rel)
+        if listing is None:
+            raise FileNotFoundError(errno.ENOENT, "Not in index", path)
+        return [self._path(os.path.join(rel, name))
+                for name in listing[1] + listing[2]]
+
+    def glob(self, pattern):
+        """Get the indexed paths that match a relative pattern."""
+        parts = pathlib.PurePath(pattern).parts
+        if (len(parts) == 0) or pathlib.PurePath(pattern).anchor:
+            raise NotImplementedError("Non-relative patterns are unsupported")
+        dirs = self._dirs
+        candidates = [""]
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            selected = []
+            for rel in candidates:
+                listing = dirs.get(rel)
+                if listing is None:
+                    continue
+                if part == "**":
+                    found = list(self._walk(dirs, rel))
+                    selected.extend(found)
+                    # Since Python 3.13 a trailing recursive wildcard
+                    # matches files too.
+                    if last and (sys.version_info >= (3, 13)):
+                        selected.extend(os.path.join(d, name) for d in found
+                                        for name in dirs[d][2])
+                    continue
+                names = listing[1] + listing[2] if last else listing[1]
+                selected.extend(os.path.join(rel, name)
+                                for name in fnmatch.filter(names, part))
+            candidates = list(dict.fromkeys(selected))
+        return (self._path(rel) for rel in candidates)
+
+    def rglob(self, pattern):
+        """Get the indexed paths that match a pattern in any subdirectory."""
+        return self.glob(f"**/{pattern}")
+
+    def _path(self, rel):
+        if rel == "":
+            return self.root
+        return str.__new__(Path, os.path.join(self.root, rel))
+
+    def _walk(self, dirs, rel):
+        stack = [rel]
+        while len(stack) > 0:
+            rel = stack.pop()
+            listing = dirs.get(rel)
+            if listing is None:
+                continue
+            yield rel
+            stack.extend(os.path.join(rel, name)
+                         for name in reversed(listing[1]))
+
+    def _scan_tree(self, dirs, rel):
+        stack = [rel]
+        while len(stack) > 0:
+            rel = stack.pop()
+            try:
+                dirs[rel] = _scan_listing(self._path(rel))
+            except OSError:
+                continue
+            stack.extend(os.path.join(rel, name) for name in dirs[rel][1])
+
+    def _drop(self, dirs, rel):
+        for sub in list(self._walk(dirs, rel)):
+            del dirs[sub]
+
+
+class DirHandle:
+    """Open directory that runs file system operations relative to itself.
+
+    Names are looked up in the open directory, so operations on
+    the entries of a directory deep in a tree don't walk its path again,
+    and they are not affected if the path is changed to point elsewhere.
+    """
+
+    def __init__(self, path, dir_fd=None):
+        if os.stat not in os.supports_dir_fd:
+            raise NotImplementedError("dir_fd is unsupported on this system")
+        flags = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+        self.fd = os.open(path, flags, dir_fd=dir_fd)
+        self.path = Path(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the directory."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def fileno(self):
+        """Get the file descriptor of the directory."""
+        return self.fd
+
+    def iterdir(self):
+        """Get the names of the entries in the directory."""
+        with os.scandir(self.fd) as it:
+            names = [entry.name for entry in it]
+        return (str.__new__(Path, name) for name in names)
+
+    def mkdir(self, name, mode=0o777):
+        """Create a directory in this directory."""
+        os.mkdir(name, mode, dir_fd=self.fd)
+
+    def open(self, name, mode="r", buffering=-1, encoding=None, errors=None,
+             newline=None):
+        """Open a file in this directory, like the built-in open function."""
+        return open(name, mode, buffering, encoding, errors, newline,
+                    opener=self._opener)
+
+    def _opener(self, name, flags):
+        return os.open(name, flags, 0o666, dir_fd=self.fd)
+
+    def opendir(self, name):
+        """Open a subdirectory of this directory."""
+        handle = DirHandle(name, dir_fd=self.fd)
+        handle.path = Path(self.path, name)
+        return handle
+
+    def readlink(self, name):
+        """Get the target of a symbolic link in this directory."""
+        return Path(os.readlink(name, dir_fd=self.fd))
+
+    def rename(self, name, target, target_dir=None):
+        """Rename an entry, optionally moving it to another open directory."""
+        target_fd = self.fd if target_dir is None else target_dir.fd
+        os.rename(name, target, src_dir_fd=self.fd, dst_dir_fd=target_fd)
+
+    def rmdir(self, name):
+        """Remove an empty directory in this directory."""
+        os.rmdir(name, dir_fd=self.fd)
+
+    def stat(self, name, follow_symlinks=True):
+        """Get the status of an entry in this directory."""
+        return os.stat(name, dir_fd=self.fd, follow_symlinks=follow_symlinks)
+
+    def unlink(self, name):
+        """Remove a file or a symbolic link in this directory."""
+        os.unlink(name, dir_fd=self.fd)
+
+
+def _load_path(value):
+    return str.__new__(Path, value)
+
+
+_PATHS_MAGIC = b"PSP1"
+
+
+def dumps_paths(paths):
+    """Encode a sequence of paths into a compact binary form.
+
+    Every path is stored as the length of the prefix it shares with
+    the previous path followed by the rest of the path, so paths in
+    the order of a tree walk take up little space.
+    """
+    prefixes = []
+    suffixes = []
+    previous = ""
+    for path in paths:
+        path = str(path)
+        n = len(os.path.commonprefix([previous, path]))
+        prefixes.append(n)
+        suffixes.append(path[n:])
+        previous = path
+    typecode = "H" if max(prefixes, default=0) < 2 ** 16 else "I"
+    lengths = array(typecode, prefixes)
+    if sys.byteorder == "big":
+        lengths.byteswap()
+    return b"".join([
+        _PATHS_MAGIC,
+        typecode.encode("ascii"),
+        struct.pack("<Q", len(prefixes)),
+        lengths.tobytes(),
+        "\0".join(suffixes).encode("utf-8", "surrogatepass"),
+    ])
+
+
+def loads_paths(data):
+    """Decode a sequence of paths encoded by ``dumps_paths()``.
+
+    The paths are not normalized again.
+    """
+    if not data.startswith(_PATHS_MAGIC):
+        raise ValueError("Data is not an encoded sequence of paths")
+    start = len(_PATHS_MAGIC)
+    typecode = data[start:start + 1].decode("ascii")
+    (count,) = struct.unpack_from("<Q", data, start + 1)
+    start += 9
+    lengths = array(typecode)
+    end = start + lengths.itemsize * count
+    lengths.frombytes(data[start:end])
+    if sys.byteorder == "big":
+        lengths.byteswap()
+    if count == 0:
+        return []
+    suffixes = data[end:].decode("utf-8", "surrogatepass").split("\0")
+    paths = []
+    previous = ""
+    for n, suffix in zip(lengths, suffixes):
+        previous = previous[:n] + suffix
+        paths.append(str.__new__(Path, previous))
+    return paths
+
+
+def _write_entry(path, value):
+    if isinstance(value, Symlink):
+        os.symlink(value.target, path)
+        return
+    data = value.encode("utf-8") if isinstance(value, str) else value
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def materialize(spec, root, workers=None):
+    """Create a tree of directories, files and symbolic links under a root.
+
+    The specification maps relative paths to entries: ``None`` for
+    a directory, ``bytes`` or ``str`` for the contents of a file,
+    and a ``Symlink`` for a symbolic link. All directories, including
+    the missing parents of files and links, are created once and in order.
+    Files and links are then written concurrently on a thread pool.
+    """
+    start = time.perf_counter()
+    root = str(Path(root))
+    dirs = set()
+    entries = []
+
+    def add_dir(path):
+        while (path not in dirs) and (path != root):
+            dirs.add(path)
+            path = os.path.dirname(path)
+
+    for name, value in spec.items():
+        rel = os.path.normpath(name)
+        if os.path.isabs(rel) or (rel.split(os.sep)[0] == os.pardir):
+            raise ValueError(f"'{name}' is not in the subpath of '{root}'")
+        path = os.path.join(root, rel)
+        if value is None:
+            add_dir(path)
+        else:
+            if rel == os.curdir:
+                raise ValueError(f"'{name}' is the root, not a file")
+            add_dir(os.path.dirname(path))
+            entries.append((path, value))
+
+    files = {path for path, _ in entries}
+    if len(files) != len(entries):
+        raise ValueError("Multiple entries for the same file")
+    conflicts = sorted(files & dirs)
+    if len(conflicts) > 0:
+        raise ValueError(f"'{conflicts[0]}' is both a file and a directory")
+
+    os.makedirs(root, exist_ok=True)
+    created = 0
+    for path in sorted(dirs):
+        try:
+            os.mkdir(path)
+            created += 1
+        except FileExistsError:
+            pass
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda e: _write_entry(*e), entries))
+
+    links = sum(1 for _, value in entries if isinstance(value, Symlink))
+    return MaterializeStats(dirs=created, files=len(entries) - links,
+                            links=links, elapsed=time.perf_counter() - start)
+
+
+_AT_FDCWD = -100
+_RENAME_NOREPLACE = 1
+
+
+@lru_cache(maxsize=None)
+def _load_renameat2():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+
+        func = ctypes.CDLL(None, use_errno=True).renameat2
+    except (ImportError, OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                     ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    return func
+
+
+def _rename_no_replace(src, dst):
+    renameat2 = _load_renameat2()
+    if renameat2 is not None:
+        if renameat2(_AT_FDCWD, os.fsencode(src), _AT_FDCWD,
+                     os.fsencode(dst), _RENAME_NOREPLACE) == 0:
+            return
+        import ctypes
+
+        code = ctypes.get_errno()
+        if code not in (errno.EINVAL, errno.ENOSYS):
+            raise OSError(code, os.strerror(code), src, None, dst)
+    if os.path.lexists(dst):
+        message = os.strerror(errno.EEXIST)
+        raise FileExistsError(errno.EEXIST, message, src, None, dst)
+    os.rename(src, dst)
+
+
+def rename_many(pairs, workers=None, no_replace=True):
+    """Rename many paths after validating the whole plan.
+
+    Targets must be unique and the renames must not form cycles. Missing
+    target directories are created beforehand. Independent renames run
+    concurrently on a thread pool, whereas renames into paths that are
+    themselves being renamed wait for them. Existing targets are not
+    replaced unless requested. Pairs that rename a path to itself are
+    left alone.
+    When a rename fails, the exception is raised with the list of pairs
+    that were already renamed as its ``completed`` attribute.
+    """
+    pairs = list(pairs)
+    srcs = [os.path.abspath(src) for src, _ in pairs]
+    dsts = [os.path.abspath(dst) for _, dst in pairs]
+    sources = {}
+    for i, src in enumerate(srcs):
+        if sources.setdefault(src, i) != i:
+            raise ValueError(f"Multiple renames from '{pairs[i][0]}'")
+    targets = set()
+    for i, dst in enumerate(dsts):
+        if dst in targets:
+            raise ValueError(f"Multiple renames to '{pairs[i][1]}'")
+        targets.add(dst)
+        if no_replace and (dst not in sources) and os.path.lexists(dst):
+            message = os.strerror(errno.EEXIST)
+            raise FileExistsError(errno.EEXIST, message, pairs[i][1])
+    moves = [i for i in range(len(pairs)) if srcs[i] != dsts[i]]
+    for i in set(range(len(pairs))).difference(moves):
+        del sources[srcs[i]]
+        targets.remove(dsts[i])
+
+    checks = [(pairs[i][0], srcs[i], False) for i in moves]
+    checks += [(pairs[i][1], dsts[i], True) for i in moves]
+    for name, path, is_target in checks:
+        parent = os.path.dirname(path)
+        while parent != os.path.dirname(parent):
+            if (parent in sources) or (is_target and (parent in targets)):
+                raise ValueError(f"'{name}' is inside another renamed path")
+            parent = os.path.dirname(parent)
+
+    waves = {}
+    for i in moves:
+        chain = {}
+        j = i
+        while (j is not None) and (j not in waves):
+            if j in chain:
+                raise ValueError(f"Renames form a cycle at '{pairs[j][0]}'")
+            chain[j] = True
+            j = sources.get(dsts[j])
+        wave = -1 if j is None else waves[j]
+        for k in reversed(list(chain)):
+            wave += 1
+            waves[k] = wave
+    batches = [[] for _ in range(max(waves.values(), default=-1) + 1)]
+    for i, wave in waves.items():
+        batches[wave].append(i)
+
+    for parent in sorted({os.path.dirname(dsts[i]) for i in moves}):
+        os.makedirs(parent, exist_ok=True)
+
+    rename = _rename_no_replace if no_replace else os.replace
+    completed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch in batches:
+            futures = [executor.submit(rename, srcs[i], dsts[i])
+                       for i in batch]
+            error = None
+            for i, future in zip(batch, futures):
+                try:
+                    future.result()
+                    completed.append(pairs[i])
+                except OSError as e:
+                    error = e if error is None else error
+            if error is not None:
+                error.completed = completed
+                raise error
+    return completed
+
+
+def dedupe(groups, link=True):
+    """Remove the duplicates in groups of identical files.
+
+    The first file of every group is kept, and the others are replaced
+    with hard links to it, or deleted if linking is not requested.
+    The number of bytes reclaimed is returned.
+    """
+    reclaimed = 0
+    for keep, *duplicates in groups:
+        for path in duplicates:
+            st = os.lstat(path)
+            if os.path.samestat(st, os.lstat(keep)):
+                continue
+            if link:
+                temp = f"{path}.dedupe"
+                os.link(keep, temp)
+                os.replace(temp, path)
+            else:
+                os.unlink(path)
+            if st.st_nlink == 1:
+                reclaimed += st.st_size
+    return reclaimed
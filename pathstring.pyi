@@ -1,7 +1,26 @@
-from typing import Any, Generator, IO, List, Optional, Sequence, Tuple, Type, Union
+from typing import Any, Callable, Dict, Generator, IO, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Type, Union
 
 import os
 
+class DiskUsage(NamedTuple):
+    apparent: int
+    allocated: int
+
+class Symlink(NamedTuple):
+    target: Union[str, Path]
+
+class SyncSummary(NamedTuple):
+    created: List[Path]
+    copied: List[Path]
+    deleted: List[Path]
+    unchanged: List[Path]
+
+class MaterializeStats(NamedTuple):
+    dirs: int
+    files: int
+    links: int
+    elapsed: float
+
 class Path(str):
     anchor: str
     drive: str
@@ -26,11 +45,15 @@ class Path(str):
     def home(cls) -> Path: ...
 
     def absolute(self) -> Path: ...
+    def archive_to(self, dest: Union[str, Path], format: str = ..., workers: Optional[int] = ...) -> None: ...
     def as_posix(self) -> str: ...
     def as_uri(self) -> str: ...
     def chmod(self, mode: int) -> None: ...
+    def disk_usage(self, depth: Optional[int] = ..., workers: Optional[int] = ..., follow_symlinks: bool = ..., one_filesystem: bool = ...) -> Dict[Path, DiskUsage]: ...
     def exists(self) -> bool: ...
     def expanduser(self) -> Path: ...
+    def extract_from(self, archive: Union[str, Path]) -> None: ...
+    def find_duplicates(self, workers: Optional[int] = ...) -> List[List[Path]]: ...
     def glob(self, pattern: str) -> Generator[Path, None, None]: ...
     def group(self) -> str: ...
     def hardlink_to(self, target: Path) -> None: ...
@@ -50,8 +73,10 @@ class Path(str):
     def lchmod(self, mode: int) -> None: ...
     def link_to(self, target: Path) -> None: ...
     def lstat(self) -> os.stat_result: ...
+    def map_files(self, func: Callable[[Path], Any], pattern: str = ..., processes: Optional[int] = ..., chunksize: int = ..., ordered: bool = ...) -> Generator[Tuple[Path, Any], None, None]: ...
     def match(self, path_pattern: str) -> bool: ...
     def mkdir(self, mode: int = ..., parents: bool = ..., exist_ok: bool = ...) -> None: ...
+    def opendir(self) -> DirHandle: ...
     def open(self, mode: str = ..., buffering: int = ..., encoding: Optional[str] = ..., errors: Optional[str] = ..., newline: Optional[str] = ...) -> IO[Any]: ...
     def owner(self) -> str: ...
     def read_bytes(self) -> bytes: ...
@@ -61,11 +86,13 @@ class Path(str):
     def rename(self, target: Path) -> None: ...
     def resolve(self, strict: bool = ...) -> Path: ...
     def rglob(self, pattern: str) -> Generator[Path, None, None]: ...
+    def rglob_ignoring(self, pattern: str = ..., ignore_files: Sequence[str] = ..., exclude: Sequence[str] = ...) -> Generator[Path, None, None]: ...
     def rmdir(self) -> None: ...
     def rmtree(self, ignore_errors: bool = ..., onerror: bool = ...) -> None: ...
     def samefile(self, other_path: Path) -> bool: ...
     def stat(self) -> os.stat_result: ...
     def symlink_to(self, target: Path, target_is_directory: bool = ...) -> None: ...
+    def sync_to(self, dest: Union[str, Path], delete: bool = ..., workers: Optional[int] = ..., checksum: bool = ..., dry_run: bool = ...) -> SyncSummary: ...
     def touch(self, mode: int = ..., exist_ok: bool = ...) -> None: ...
     def unlink(self) -> None: ...
     def with_name(self, name: str) -> Path: ...
@@ -73,3 +100,54 @@ class Path(str):
     def with_suffix(self, suffix: str) -> Path: ...
     def write_bytes(self, data: bytes) -> int: ...
     def write_text(self, data: str, encoding: Optional[str] = ..., errors: Optional[str] = ...) -> int: ...
+
+def materialize(spec: Mapping[Union[str, Path], Union[None, bytes, str, Symlink]], root: Union[str, Path], workers: Optional[int] = ...) -> MaterializeStats: ...
+
+class Resolver:
+    def __init__(self) -> None: ...
+    def invalidate(self, prefix: Optional[Union[str, Path]] = ...) -> None: ...
+    def resolve(self, path: Union[str, Path], strict: bool = ...) -> Path: ...
+
+def resolve_many(paths: Iterable[Union[str, Path]], strict: bool = ..., resolver: Optional[Resolver] = ...) -> List[Path]: ...
+
+class TreeIndex:
+    root: Path
+    filename: Union[str, Path]
+
+    @classmethod
+    def build(cls, root: Union[str, Path], filename: Union[str, Path]) -> TreeIndex: ...
+
+    @classmethod
+    def load(cls, filename: Union[str, Path]) -> TreeIndex: ...
+
+    def save(self) -> None: ...
+    def refresh(self) -> List[Path]: ...
+    def listdir(self, path: Optional[Union[str, Path]] = ...) -> List[Path]: ...
+    def glob(self, pattern: str) -> Iterator[Path]: ...
+    def rglob(self, pattern: str) -> Iterator[Path]: ...
+
+def dumps_paths(paths: Iterable[Union[str, Path]]) -> bytes: ...
+def loads_paths(data: bytes) -> List[Path]: ...
+
+class DirHandle:
+    fd: int
+    path: Path
+
+    def __init__(self, path: Union[str, Path], dir_fd: Optional[int] = ...) -> None: ...
+    def __enter__(self) -> DirHandle: ...
+    def __exit__(self, *exc_info: Any) -> None: ...
+    def close(self) -> None: ...
+    def fileno(self) -> int: ...
+    def iterdir(self) -> Iterator[Path]: ...
+    def mkdir(self, name: Union[str, Path], mode: int = ...) -> None: ...
+    def open(self, name: Union[str, Path], mode: str = ..., buffering: int = ..., encoding: Optional[str] = ..., errors: Optional[str] = ..., newline: Optional[str] = ...) -> IO[Any]: ...
+    def opendir(self, name: Union[str, Path]) -> DirHandle: ...
+    def readlink(self, name: Union[str, Path]) -> Path: ...
+    def rename(self, name: Union[str, Path], target: Union[str, Path], target_dir: Optional[DirHandle] = ...) -> None: ...
+    def rmdir(self, name: Union[str, Path]) -> None: ...
+    def stat(self, name: Union[str, Path], follow_symlinks: bool = ...) -> os.stat_result: ...
+    def unlink(self, name: Union[str, Path]) -> None: ...
+
+def rename_many(pairs: Iterable[Tuple[Union[str, Path], Union[str, Path]]], workers: Optional[int] = ..., no_replace: bool = ...) -> List[Tuple[Union[str, Path], Union[str, Path]]]: ...
+
+def dedupe(groups: Iterable[Sequence[Union[str, Path]]], link: bool = ...) -> int: ...
@@ -1,12 +1,18 @@
 from pytest import mark, raises
 
+import io
 import os
+import pickle
 import shutil
+import stat
 import sys
+import tarfile
 import time
+import zipfile
 from importlib import metadata
 
-from pathstring import Path, __version__
+from pathstring import Path, Symlink, TreeIndex, __version__, dedupe, \
+    dumps_paths, loads_paths, materialize, rename_many
 
 
 def test_installed_version_should_match_tested_version():
@@ -511,3 +517,529 @@ def test_rmtree_should_fail_for_nonexisting_directory(fs):
 
 def test_rmtree_should_not_fail_for_nonexisting_directory_if_ignoring_errors(fs):
     Path(fs, "tmp1").rmtree(ignore_errors=True)
+
+
+def test_disk_usage_should_include_subdirectories_in_totals(fs):
+    root = os.path.join(fs, "du1")
+    os.makedirs(os.path.join(root, "sub"))
+    with open(os.path.join(root, "a.txt"), "wb") as f:
+        f.write(b"a" * 10)
+    with open(os.path.join(root, "sub", "b.txt"), "wb") as f:
+        f.write(b"b" * 20)
+    usage = Path(root).disk_usage(workers=2)
+    sub_size = os.stat(os.path.join(root, "sub")).st_size
+    assert usage[Path(root, "sub")].apparent == sub_size + 20
+    assert usage[Path(root)].apparent == os.stat(root).st_size + sub_size + 30
+    shutil.rmtree(root)
+
+
+def test_disk_usage_should_count_hard_links_once(fs):
+    root = os.path.join(fs, "du1")
+    os.makedirs(root)
+    with open(os.path.join(root, "a.txt"), "wb") as f:
+        f.write(b"a" * 10)
+    os.link(os.path.join(root, "a.txt"), os.path.join(root, "b.txt"))
+    usage = Path(root).disk_usage()
+    assert usage[Path(root)].apparent == os.stat(root).st_size + 10
+    shutil.rmtree(root)
+
+
+def test_disk_usage_should_only_report_directories_up_to_depth(fs):
+    root = os.path.join(fs, "du1")
+    os.makedirs(os.path.join(root, "sub", "subsub"))
+    assert set(Path(root).disk_usage(depth=1)) == {root, os.path.join(root, "sub")}
+    shutil.rmtree(root)
+
+
+def test_materialize_should_create_files_with_parent_directories(fs):
+    root = os.path.join(fs, "tree1")
+    stats = materialize({"a/b/c.txt": b"c", "a/d.txt": "döş", "e": None}, root, workers=2)
+    with open(os.path.join(root, "a", "b", "c.txt"), "rb") as f:
+        assert f.read() == b"c"
+    with open(os.path.join(root, "a", "d.txt"), "r", encoding="utf-8") as f:
+        assert f.read() == "döş"
+    assert os.path.isdir(os.path.join(root, "e"))
+    assert (stats.dirs, stats.files, stats.links) == (3, 2, 0)
+    shutil.rmtree(root)
+
+
+def test_materialize_should_create_symbolic_links(fs):
+    root = os.path.join(fs, "tree1")
+    materialize({"a.txt": b"a", "b": Symlink("a.txt")}, root)
+    assert os.readlink(os.path.join(root, "b")) == "a.txt"
+    shutil.rmtree(root)
+
+
+def test_materialize_should_not_fail_for_existing_directories(fs):
+    root = os.path.join(fs, "tree1")
+    materialize({"a/b.txt": b"b"}, root)
+    stats = materialize({"a/c.txt": b"c"}, root)
+    assert stats.dirs == 0
+    assert sorted(os.listdir(os.path.join(root, "a"))) == ["b.txt", "c.txt"]
+    shutil.rmtree(root)
+
+
+def test_materialize_should_fail_for_paths_outside_root(fs):
+    with raises(ValueError):
+        materialize({"../a.txt": b"a"}, os.path.join(fs, "tree1"))
+
+
+def test_tree_index_glob_should_match_path_glob(fs):
+    root = os.path.join(fs, "idx1")
+    materialize({"a.py": b"", "b.txt": b"", "sub/c.py": b"", "sub/deep/d.py": b""}, root)
+    index = TreeIndex.build(root, os.path.join(fs, "idx1.index"))
+    for pattern in ["*.py", "*/*.py", "**/*.py", "sub/**", "sub"]:
+        assert set(index.glob(pattern)) == set(Path(root).glob(pattern))
+    assert set(index.rglob("*.py")) == set(Path(root).rglob("*.py"))
+    shutil.rmtree(root)
+    os.unlink(os.path.join(fs, "idx1.index"))
+
+
+def test_tree_index_should_be_loaded_from_file(fs):
+    root = os.path.join(fs, "idx1")
+    materialize({"a.py": b"", "sub/b.py": b""}, root)
+    TreeIndex.build(root, os.path.join(fs, "idx1.index"))
+    index = TreeIndex.load(os.path.join(fs, "idx1.index"))
+    assert index.root == root
+    assert set(index.listdir()) == {os.path.join(root, "a.py"), os.path.join(root, "sub")}
+    shutil.rmtree(root)
+    os.unlink(os.path.join(fs, "idx1.index"))
+
+
+def test_tree_index_refresh_should_update_changed_directories(fs):
+    root = os.path.join(fs, "idx1")
+    materialize({"a.py": b"", "sub/b.py": b"", "old/c.py": b""}, root)
+    index = TreeIndex.build(root, os.path.join(fs, "idx1.index"))
+    materialize({"sub/new/d.py": b""}, root)
+    shutil.rmtree(os.path.join(root, "old"))
+    assert set(index.refresh()) == {root, os.path.join(root, "sub")}
+    assert set(index.rglob("*.py")) == set(Path(root).rglob("*.py"))
+    shutil.rmtree(root)
+    os.unlink(os.path.join(fs, "idx1.index"))
+
+
+def test_map_files_should_apply_function_to_matching_files(fs):
+    root = os.path.join(fs, "map1")
+    materialize({"a.py": b"a", "b.txt": b"bb", "sub/c.py": b"ccc"}, root)
+    results = Path(root).map_files(os.path.getsize, "*.py", processes=2, chunksize=1)
+    assert dict(results) == {os.path.join(root, "a.py"): 1, os.path.join(root, "sub", "c.py"): 3}
+    shutil.rmtree(root)
+
+
+def test_map_files_should_keep_walk_order_when_ordered(fs):
+    root = os.path.join(fs, "map1")
+    materialize({f"{i}.txt": b"x" * i for i in range(10)}, root)
+    results = Path(root).map_files(os.path.getsize, processes=2, chunksize=3, ordered=True)
+    assert [p for p, _ in results] == [p for p in Path(root).rglob("*") if p.is_file()]
+    shutil.rmtree(root)
+
+
+def test_map_files_should_attach_failing_path_to_exception(fs):
+    root = os.path.join(fs, "map1")
+    materialize({"a.txt": b"a"}, root)
+    with raises(OSError) as e:
+        list(Path(root).map_files(os.readlink, processes=1))
+    assert e.value.path == os.path.join(root, "a.txt")
+    shutil.rmtree(root)
+
+
+def test_pickled_path_should_be_unpickled_as_path():
+    path = pickle.loads(pickle.dumps(Path("/usr", "bin")))
+    assert type(path) is Path
+    assert path == "/usr/bin".replace("/", os.path.sep)
+
+
+def test_loads_paths_should_decode_paths_encoded_by_dumps_paths():
+    paths = [Path("/usr/bin"), Path("/usr/bin/python3"), Path("/usr/lib"), Path("abcöüçğış")]
+    decoded = loads_paths(dumps_paths(paths))
+    assert decoded == paths
+    assert all(type(p) is Path for p in decoded)
+
+
+def test_loads_paths_should_decode_empty_sequence():
+    assert loads_paths(dumps_paths([])) == []
+
+
+def test_dumps_paths_should_compress_common_prefixes():
+    paths = [Path("/usr/share/doc", f"file{i}.txt") for i in range(100)]
+    assert len(dumps_paths(paths)) < len("".join(paths)) / 2
+
+
+def test_loads_paths_should_fail_for_invalid_data():
+    with raises(ValueError):
+        loads_paths(b"/usr/bin")
+
+
+def test_sync_to_should_copy_tree_to_new_destination(fs):
+    src, dst = os.path.join(fs, "sync1"), os.path.join(fs, "sync2")
+    materialize({"a.txt": b"a", "sub/b.txt": b"b", "empty": None}, src)
+    summary = Path(src).sync_to(dst, workers=2)
+    assert set(summary.created) == {"sub", "empty"}
+    assert set(summary.copied) == {"a.txt", os.path.join("sub", "b.txt")}
+    with open(os.path.join(dst, "sub", "b.txt"), "rb") as f:
+        assert f.read() == b"b"
+    shutil.rmtree(src)
+    shutil.rmtree(dst)
+
+
+def test_sync_to_should_only_copy_changed_files(fs):
+    src, dst = os.path.join(fs, "sync1"), os.path.join(fs, "sync2")
+    materialize({"a.txt": b"a", "b.txt": b"b"}, src)
+    Path(src).sync_to(dst)
+    with open(os.path.join(src, "b.txt"), "wb") as f:
+        f.write(b"bb")
+    summary = Path(src).sync_to(dst)
+    assert (summary.copied, summary.unchanged) == (["b.txt"], ["a.txt"])
+    shutil.rmtree(src)
+    shutil.rmtree(dst)
+
+
+def test_sync_to_should_compare_contents_when_checksum_is_set(fs):
+    src, dst = os.path.join(fs, "sync1"), os.path.join(fs, "sync2")
+    materialize({"a.txt": b"a"}, src)
+    materialize({"a.txt": b"b"}, dst)
+    shutil.copystat(os.path.join(src, "a.txt"), os.path.join(dst, "a.txt"))
+    assert Path(src).sync_to(dst).copied == []
+    assert Path(src).sync_to(dst, checksum=True).copied == ["a.txt"]
+    shutil.rmtree(src)
+    shutil.rmtree(dst)
+
+
+def test_sync_to_should_delete_extraneous_entries_when_delete_is_set(fs):
+    src, dst = os.path.join(fs, "sync1"), os.path.join(fs, "sync2")
+    materialize({"a.txt": b"a"}, src)
+    materialize({"b.txt": b"b", "sub/c.txt": b"c"}, dst)
+    assert Path(src).sync_to(dst).deleted == []
+    summary = Path(src).sync_to(dst, delete=True)
+    assert set(summary.deleted) == {"b.txt", "sub"}
+    assert os.listdir(dst) == ["a.txt"]
+    shutil.rmtree(src)
+    shutil.rmtree(dst)
+
+
+def test_sync_to_should_not_change_destination_on_dry_run(fs):
+    src, dst = os.path.join(fs, "sync1"), os.path.join(fs, "sync2")
+    materialize({"a.txt": b"a", "sub/b.txt": b"b"}, src)
+    summary = Path(src).sync_to(dst, dry_run=True)
+    assert len(summary.copied) == 2
+    assert not os.path.exists(dst)
+    shutil.rmtree(src)
+
+
+def test_rglob_ignoring_should_skip_entries_in_ignore_files(fs):
+    root = os.path.join(fs, "ign1")
+    materialize({
+        ".gitignore": "*.log\n!keep.log\nbuild/\n",
+        "a.py": b"", "a.log": b"", "keep.log": b"",
+        "build/b.py": b"", "sub/build": b"", "sub/c.log": b"",
+    }, root)
+    assert set(Path(root).rglob_ignoring()) == {
+        os.path.join(root, p) for p in [".gitignore", "a.py", "keep.log", "sub", os.path.join("sub", "build")]
+    }
+    shutil.rmtree(root)
+
+
+def test_rglob_ignoring_should_apply_nested_ignore_files_relative_to_their_directory(fs):
+    root = os.path.join(fs, "ign1")
+    materialize({"sub/.gitignore": "/a.py\n", "a.py": b"", "sub/a.py": b"", "sub/deep/a.py": b""}, root)
+    assert set(Path(root).rglob_ignoring("*.py")) == {
+        os.path.join(root, "a.py"), os.path.join(root, "sub", "deep", "a.py")
+    }
+    shutil.rmtree(root)
+
+
+def test_rglob_ignoring_should_skip_excluded_directories(fs):
+    root = os.path.join(fs, "ign1")
+    materialize({"a.py": b"", "node_modules/b.py": b"", "sub/node_modules/c.py": b""}, root)
+    assert set(Path(root).rglob_ignoring("*.py", exclude=["node_modules/"])) == {
+        os.path.join(root, "a.py")
+    }
+    shutil.rmtree(root)
+
+
+def test_rglob_ignoring_should_match_patterns_like_rglob(fs):
+    root = os.path.join(fs, "ign1")
+    materialize({"a/b.py": b"", "a/c/d.py": b"", "e/a/f.py": b""}, root)
+    assert set(Path(root).rglob_ignoring("a/*.py")) == set(Path(root).rglob("a/*.py"))
+    shutil.rmtree(root)
+
+
+@mark.parametrize("format", ["tar", "tar.gz", "zip"])
+def test_extract_from_should_restore_tree_written_by_archive_to(fs, format):
+    src, dst = os.path.join(fs, "arc1"), os.path.join(fs, "arc2")
+    archive = os.path.join(fs, "arc1.archive")
+    materialize({"a.txt": b"a", "sub/b.txt": b"b" * 2000000, "empty": None, "link": Symlink("a.txt")}, src)
+    Path(src).archive_to(archive, format=format, workers=2)
+    Path(dst).extract_from(archive)
+    assert sorted(os.listdir(dst)) == ["a.txt", "empty", "link", "sub"]
+    with open(os.path.join(dst, "sub", "b.txt"), "rb") as f:
+        assert f.read() == b"b" * 2000000
+    assert os.readlink(os.path.join(dst, "link")) == "a.txt"
+    shutil.rmtree(src)
+    shutil.rmtree(dst)
+    os.unlink(archive)
+
+
+def test_archive_to_should_fail_for_unknown_format(fs):
+    with raises(ValueError):
+        Path(fs).archive_to(os.path.join(fs, "arc1.archive"), format="rar")
+
+
+def test_extract_from_zip_should_reject_links_outside_directory(fs):
+    src, dst = os.path.join(fs, "arc1"), os.path.join(fs, "arc2")
+    archive = os.path.join(fs, "arc1.archive")
+    materialize({"link": Symlink(os.path.join("..", "file1.txt"))}, src)
+    Path(src).archive_to(archive, format="zip")
+    with raises(ValueError):
+        Path(dst).extract_from(archive)
+    shutil.rmtree(src)
+    shutil.rmtree(dst)
+    os.unlink(archive)
+
+
+def test_rename_many_should_rename_into_new_directories(fs):
+    root = os.path.join(fs, "ren1")
+    materialize({f"{i}.txt": str(i) for i in range(10)}, root)
+    pairs = [(Path(root, f"{i}.txt"), Path(root, f"s{i % 2}", f"{i}.md")) for i in range(10)]
+    assert rename_many(pairs, workers=4) == pairs
+    assert sorted(os.listdir(os.path.join(root, "s1"))) == [f"{i}.md" for i in range(1, 10, 2)]
+    shutil.rmtree(root)
+
+
+def test_rename_many_should_run_chained_renames_in_order(fs):
+    root = os.path.join(fs, "ren1")
+    materialize({"a": "a", "b": "b"}, root)
+    rename_many([(Path(root, "a"), Path(root, "b")), (Path(root, "b"), Path(root, "c"))])
+    with open(os.path.join(root, "c"), encoding="utf-8") as f:
+        assert f.read() == "b"
+    with open(os.path.join(root, "b"), encoding="utf-8") as f:
+        assert f.read() == "a"
+    shutil.rmtree(root)
+
+
+def test_rename_many_should_fail_for_duplicate_targets(fs):
+    with raises(ValueError):
+        rename_many([(Path(fs, "a"), Path(fs, "c")), (Path(fs, "b"), Path(fs, "c"))])
+
+
+def test_rename_many_should_fail_for_cycles(fs):
+    with raises(ValueError):
+        rename_many([(Path(fs, "a"), Path(fs, "b")), (Path(fs, "b"), Path(fs, "a"))])
+
+
+def test_rename_many_should_leave_paths_renamed_to_themselves(fs):
+    root = os.path.join(fs, "ren1")
+    materialize({"a": "a", "b": "b"}, root)
+    pairs = [(Path(root, "a"), Path(root, "a")), (Path(root, "b"), Path(root, "c"))]
+    assert rename_many(pairs) == pairs[1:]
+    assert sorted(os.listdir(root)) == ["a", "c"]
+    shutil.rmtree(root)
+
+
+def test_rename_many_should_not_replace_existing_targets(fs):
+    root = os.path.join(fs, "ren1")
+    materialize({"a": "a", "b": "b", "c": "c"}, root)
+    with raises(FileExistsError):
+        rename_many([(Path(root, "a"), Path(root, "d")), (Path(root, "b"), Path(root, "c"))])
+    assert sorted(os.listdir(root)) == ["a", "b", "c"]
+    shutil.rmtree(root)
+
+
+def test_rename_many_should_report_completed_renames_on_failure(fs):
+    root = os.path.join(fs, "ren1")
+    materialize({"a": "a"}, root)
+    with raises(FileNotFoundError) as e:
+        rename_many([(Path(root, "a"), Path(root, "b")), (Path(root, "x"), Path(root, "y"))])
+    assert e.value.completed == [(Path(root, "a"), Path(root, "b"))]
+    shutil.rmtree(root)
+
+
+def test_find_duplicates_should_group_files_with_same_contents(fs):
+    root = os.path.join(fs, "dup1")
+    materialize({"a": b"x", "b": b"x", "sub/c": b"x", "d": b"y", "e": b"", "f": b""}, root)
+    assert Path(root).find_duplicates(workers=2) == [
+        [Path(root, "a"), Path(root, "b"), Path(root, "sub", "c")]
+    ]
+    shutil.rmtree(root)
+
+
+def test_find_duplicates_should_compare_full_contents_of_large_files(fs):
+    root = os.path.join(fs, "dup1")
+    head, tail = b"h" * 10000, b"t" * 10000
+    materialize({"a": head + b"1" + tail, "b": head + b"2" + tail, "c": head + b"1" + tail}, root)
+    assert Path(root).find_duplicates() == [[Path(root, "a"), Path(root, "c")]]
+    shutil.rmtree(root)
+
+
+def test_find_duplicates_should_not_report_hard_links(fs):
+    root = os.path.join(fs, "dup1")
+    materialize({"a": b"x"}, root)
+    os.link(os.path.join(root, "a"), os.path.join(root, "b"))
+    assert Path(root).find_duplicates() == []
+    shutil.rmtree(root)
+
+
+def test_dedupe_should_replace_duplicates_with_hard_links(fs):
+    root = os.path.join(fs, "dup1")
+    materialize({"a": b"xyz", "b": b"xyz"}, root)
+    assert dedupe(Path(root).find_duplicates()) == 3
+    assert os.path.samefile(os.path.join(root, "a"), os.path.join(root, "b"))
+    assert Path(root).find_duplicates() == []
+    shutil.rmtree(root)
+
+
+def test_dedupe_should_delete_duplicates_when_not_linking(fs):
+    root = os.path.join(fs, "dup1")
+    materialize({"a": b"xyz", "b": b"xyz"}, root)
+    dedupe(Path(root).find_duplicates(), link=False)
+    assert os.listdir(root) == ["a"]
+    shutil.rmtree(root)
+
+
+def test_materialize_should_fail_for_conflicting_entries_before_changes(fs):
+    root = os.path.join(fs, "tree1")
+    with raises(ValueError):
+        materialize({"a": b"x", "a/b": b"y"}, root)
+    assert not os.path.exists(root)
+
+
+def test_tree_index_should_not_depend_on_working_directory(fs, monkeypatch):
+    root = os.path.join(fs, "idx1")
+    materialize({"a.py": b""}, root)
+    monkeypatch.chdir(fs)
+    index = TreeIndex.build("idx1", os.path.join(fs, "idx1.index"))
+    monkeypatch.chdir(os.path.dirname(fs))
+    assert index.root == root
+    assert index.refresh() == []
+    assert list(index.rglob("*.py")) == [os.path.join(root, "a.py")]
+    shutil.rmtree(root)
+    os.unlink(os.path.join(fs, "idx1.index"))
+
+
+def test_rglob_ignoring_should_expand_recursive_wildcards_like_rglob(fs):
+    root = os.path.join(fs, "ign1")
+    materialize({"a/x.py": b"", "a/b/c.py": b"", "a/b/e/f.py": b"", "g.py": b""}, root)
+    for pattern in ["a/**/*.py", "b/**/*.py", "a/**", "**/*.py", "**"]:
+        assert set(Path(root).rglob_ignoring(pattern)) == set(Path(root).rglob(pattern))
+    shutil.rmtree(root)
+
+
+def test_extract_from_zip_should_reject_members_through_extracted_links(fs):
+    dst = os.path.join(fs, "arc2")
+    archive = os.path.join(fs, "arc1.archive")
+    with zipfile.ZipFile(archive, "w") as zf:
+        for name, target in [("x", "."), ("x/y", "..")]:
+            info = zipfile.ZipInfo(name)
+            info.external_attr = (stat.S_IFLNK | 0o777) << 16
+            zf.writestr(info, target)
+        zf.writestr("y/escaped.txt", b"escaped")
+    with raises(ValueError):
+        Path(dst).extract_from(archive)
+    assert not os.path.exists(os.path.join(fs, "y"))
+    shutil.rmtree(dst)
+    os.unlink(archive)
+
+
+def test_extract_from_should_detect_tar_ending_with_zip_member(fs):
+    src, dst = os.path.join(fs, "arc1"), os.path.join(fs, "arc2")
+    archive = os.path.join(fs, "arc1.archive")
+    materialize({"a.txt": b"a"}, src)
+    with zipfile.ZipFile(os.path.join(src, "z.zip"), "w") as zf:
+        zf.writestr("inner.txt", b"inner")
+    Path(src).archive_to(archive, format="tar")
+    Path(dst).extract_from(archive)
+    assert sorted(os.listdir(dst)) == ["a.txt", "z.zip"]
+    shutil.rmtree(src)
+    shutil.rmtree(dst)
+    os.unlink(archive)
+
+
+def test_archive_to_tar_should_store_hard_links_as_links(fs):
+    src = os.path.join(fs, "arc1")
+    archive = os.path.join(fs, "arc1.archive")
+    materialize({"a.txt": b"a"}, src)
+    os.link(os.path.join(src, "a.txt"), os.path.join(src, "b.txt"))
+    Path(src).archive_to(archive, format="tar")
+    with tarfile.open(archive) as tf:
+        kinds = {m.name: m.islnk() for m in tf.getmembers() if m.name}
+    assert sorted(kinds.values()) == [False, True]
+    shutil.rmtree(src)
+    os.unlink(archive)
+
+
+def test_extract_from_tar_should_reject_unsafe_members_without_data_filter(fs, monkeypatch):
+    dst = os.path.join(fs, "arc2")
+    archive = os.path.join(fs, "arc1.archive")
+    with tarfile.open(archive, "w") as tf:
+        info = tarfile.TarInfo("../escaped.txt")
+        info.size = 7
+        tf.addfile(info, io.BytesIO(b"escaped"))
+    monkeypatch.delattr(tarfile, "data_filter", raising=False)
+    with raises(ValueError):
+        Path(dst).extract_from(archive)
+    assert not os.path.exists(os.path.join(fs, "escaped.txt"))
+    shutil.rmtree(dst)
+    os.unlink(archive)
+
+
+def test_rename_many_should_fail_for_sources_inside_other_sources(fs):
+    root = os.path.join(fs, "ren1")
+    materialize({"d/x": "x"}, root)
+    with raises(ValueError):
+        rename_many([(Path(root, "d"), Path(root, "e")), (Path(root, "d", "x"), Path(root, "d", "y"))])
+    assert os.listdir(root) == ["d"]
+    shutil.rmtree(root)
+
+
+def test_find_duplicates_should_skip_unreadable_directories(fs, monkeypatch):
+    root = os.path.join(fs, "dup1")
+    materialize({"a": b"x", "b": b"x", "locked/c": b"x"}, root)
+    scandir = os.scandir
+
+    def failing_scandir(path):
+        if os.path.basename(os.path.normpath(path)) == "locked":
+            raise PermissionError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", failing_scandir)
+    assert Path(root).find_duplicates() == [[Path(root, "a"), Path(root, "b")]]
+    monkeypatch.undo()
+    shutil.rmtree(root)
+
+
+def test_sync_to_should_fail_for_unreadable_directories_without_deleting(fs, monkeypatch):
+    src, dst = os.path.join(fs, "sync1"), os.path.join(fs, "sync2")
+    materialize({"a": b"a", "locked/c": b"c"}, src)
+    Path(src).sync_to(dst)
+    scandir = os.scandir
+
+    def failing_scandir(path):
+        if os.path.normpath(path) == os.path.join(src, "locked"):
+            raise PermissionError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", failing_scandir)
+    with raises(PermissionError):
+        Path(src).sync_to(dst, delete=True)
+    monkeypatch.undo()
+    assert os.path.exists(os.path.join(dst, "locked", "c"))
+    shutil.rmtree(src)
+    shutil.rmtree(dst)
+
+
+def test_archive_to_should_fail_for_unreadable_directories(fs, monkeypatch):
+    src = os.path.join(fs, "arc1")
+    materialize({"a": b"a", "locked/c": b"c"}, src)
+    scandir = os.scandir
+
+    def failing_scandir(path):
+        if os.path.basename(os.path.normpath(path)) == "locked":
+            raise PermissionError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", failing_scandir)
+    with raises(PermissionError):
+        Path(src).archive_to(os.path.join(fs, "arc1.archive"))
+    monkeypatch.undo()
+    shutil.rmtree(src)
+    os.unlink(os.path.join(fs, "arc1.archive"))
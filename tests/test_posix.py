@@ -4,7 +4,7 @@ import os
 import shutil
 import sys
 
-from pathstring import Path
+from pathstring import Path, Resolver, resolve_many
 
 
 if sys.platform != "win32":
@@ -117,3 +117,136 @@ def test_unlink_should_not_remove_directory_even_if_empty(fs):
     os.mkdir(sub2)
     with raises(IsADirectoryError):
         Path(sub2).unlink()
+
+
+def test_resolve_many_should_match_realpath(fs):
+    root = os.path.join(fs, "res1")
+    os.makedirs(os.path.join(root, "real", "sub"))
+    os.symlink(os.path.join(root, "real"), os.path.join(root, "link"))
+    os.symlink("sub", os.path.join(root, "real", "sublink"))
+    paths = [
+        os.path.join(root, "link", "sub"),
+        os.path.join(root, "link", "sublink", "x.txt"),
+        os.path.join(root, "link", "..", "link", "sub"),
+    ]
+    assert resolve_many(paths) == [os.path.realpath(p) for p in paths]
+    shutil.rmtree(root)
+
+
+def test_resolver_should_use_stale_cache_until_invalidated(fs):
+    root = os.path.join(fs, "res1")
+    os.makedirs(os.path.join(root, "a"))
+    os.makedirs(os.path.join(root, "b"))
+    link = os.path.join(root, "link")
+    os.symlink(os.path.join(root, "a"), link)
+    resolver = Resolver()
+    assert resolver.resolve(link) == os.path.join(root, "a")
+    os.unlink(link)
+    os.symlink(os.path.join(root, "b"), link)
+    assert resolver.resolve(link) == os.path.join(root, "a")
+    resolver.invalidate(link)
+    assert resolver.resolve(link) == os.path.join(root, "b")
+    shutil.rmtree(root)
+
+
+def test_resolver_should_fail_for_nonexisting_path_when_strict(fs):
+    with raises(FileNotFoundError):
+        Resolver().resolve(os.path.join(fs, "res0", "file.txt"), strict=True)
+
+
+def test_resolver_should_not_fail_for_nonexisting_path_when_not_strict(fs):
+    path = os.path.join(fs, "res0", "file.txt")
+    assert Resolver().resolve(path) == path
+
+
+def test_opendir_should_list_entry_names(fs):
+    with Path(fs, "sub1").opendir() as d:
+        names = list(d.iterdir())
+    assert names == ["mod2.py"]
+    assert type(names[0]) is Path
+
+
+def test_opendir_should_operate_on_entries_relative_to_directory(fs):
+    root = os.path.join(fs, "dir1")
+    os.mkdir(root)
+    with Path(root).opendir() as d:
+        d.mkdir("sub")
+        with d.open("a.txt", "w") as f:
+            f.write("a")
+        assert d.stat("a.txt").st_size == 1
+        with d.opendir("sub") as sub:
+            d.rename("a.txt", "b.txt", target_dir=sub)
+            assert sub.path == os.path.join(root, "sub")
+            assert list(sub.iterdir()) == ["b.txt"]
+            sub.unlink("b.txt")
+        d.rmdir("sub")
+    assert os.listdir(root) == []
+    os.rmdir(root)
+
+
+def test_opendir_readlink_should_return_link_target(fs):
+    with Path(fs).opendir() as d:
+        assert d.readlink("link1") == os.path.join(fs, "file1.txt")
+
+
+def test_resolver_invalidate_should_drop_links_through_prefix(fs):
+    root = os.path.join(fs, "res1")
+    for d in ["b/y", "c/y"]:
+        os.makedirs(os.path.join(root, d))
+    os.symlink(os.path.join(root, "b"), os.path.join(root, "m"))
+    os.symlink(os.path.join(root, "m", "y"), os.path.join(root, "L"))
+    resolver = Resolver()
+    assert resolver.resolve(os.path.join(root, "L")) == os.path.join(root, "b", "y")
+    os.unlink(os.path.join(root, "m"))
+    os.symlink(os.path.join(root, "c"), os.path.join(root, "m"))
+    resolver.invalidate(os.path.join(root, "m"))
+    assert resolver.resolve(os.path.join(root, "L")) == os.path.join(root, "c", "y")
+    shutil.rmtree(root)
+
+
+def test_resolver_should_fail_for_deleted_file_when_strict(fs):
+    root = os.path.join(fs, "res1")
+    os.makedirs(root)
+    path = os.path.join(root, "a.txt")
+    with open(path, "wb"):
+        pass
+    resolver = Resolver()
+    assert resolver.resolve(path, strict=True) == path
+    os.unlink(path)
+    with raises(FileNotFoundError):
+        resolver.resolve(path, strict=True)
+    shutil.rmtree(root)
+
+
+def test_opendir_open_should_create_file_with_default_permissions(fs):
+    root = os.path.join(fs, "dir1")
+    os.mkdir(root)
+    with Path(root).opendir() as d:
+        with d.open("a.txt", "w"):
+            pass
+    assert os.stat(os.path.join(root, "a.txt")).st_mode == 33188
+    shutil.rmtree(root)
+
+
+def test_resolver_should_not_trust_cached_dangling_links_when_strict(fs):
+    root = os.path.join(fs, "res1")
+    os.makedirs(root)
+    os.symlink(os.path.join("missing", "x"), os.path.join(root, "b"))
+    resolver = Resolver()
+    assert resolver.resolve(os.path.join(root, "b")) == os.path.join(root, "missing", "x")
+    with raises(FileNotFoundError):
+        resolver.resolve(os.path.join(root, "b", ".."), strict=True)
+    shutil.rmtree(root)
+
+
+def test_rglob_ignoring_should_follow_links_like_rglob(fs):
+    root = os.path.join(fs, "ign2")
+    os.makedirs(os.path.join(root, "a", "d"))
+    for name in ["x.py", os.path.join("d", "x.py")]:
+        with open(os.path.join(root, "a", name), "w"):
+            pass
+    os.symlink(os.path.join(root, "a"), os.path.join(root, "lnk"))
+    patterns = ["*/*.py", "lnk/*", "**/*/x.py", "**", "lnk/**", "*.py"]
+    for pattern in patterns:
+        assert set(Path(root).rglob_ignoring(pattern)) == set(Path(root).rglob(pattern))
+    shutil.rmtree(root)
@@ -0,0 +1,103 @@
+from pytest import mark
+
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pathstring import Path, Resolver, Symlink, TreeIndex, materialize
+
+
+free_threaded = not getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+def make_tree(root, dirs=20, files=20):
+    spec = {f"d{i}/f{j}.txt": b"x" * j for i in range(dirs) for j in range(files)}
+    spec["link"] = Symlink("d0")
+    materialize(spec, root)
+
+
+def test_shared_resolver_should_give_same_results_in_all_threads(fs):
+    root = os.path.join(fs, "thr1")
+    make_tree(root)
+    paths = [os.path.join(root, "link", f"f{j}.txt") for j in range(20)] * 50
+    resolver = Resolver()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(resolver.resolve, paths))
+    assert results == [os.path.realpath(p) for p in paths]
+    shutil.rmtree(root)
+
+
+def test_concurrent_disk_usage_calls_should_give_same_results(fs):
+    root = os.path.join(fs, "thr1")
+    make_tree(root)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: Path(root).disk_usage(workers=4), range(16)))
+    assert all(r == results[0] for r in results)
+    shutil.rmtree(root)
+
+
+def test_tree_index_queries_should_run_while_refreshing(fs):
+    root = os.path.join(fs, "thr1")
+    make_tree(root)
+    index = TreeIndex.build(root, os.path.join(fs, "thr1.index"))
+    expected = set(Path(root).rglob("*.txt"))
+
+    def query(_):
+        return set(index.rglob("*.txt"))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(query, i) for i in range(32)]
+        for i in range(20):
+            os.utime(os.path.join(root, f"d{i}"), ns=(i, i))
+            index.refresh()
+        assert all(f.result() == expected for f in futures)
+    shutil.rmtree(root)
+    os.unlink(os.path.join(fs, "thr1.index"))
+
+
+def walk(chunk):
+    return sum(1 for d in chunk for _ in d.rglob("*"))
+
+
+def stat_all(chunk):
+    for path in chunk:
+        path.stat()
+    return len(chunk)
+
+
+def throughput(func, items, workers, repeat=3):
+    chunks = [items[i::workers] for i in range(workers)]
+    rates = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            count = sum(executor.map(func, chunks))
+        rates.append(count / (time.perf_counter() - start))
+    return count, max(rates)
+
+
+def test_walk_and_stat_should_count_same_entries_in_all_threads(fs):
+    root = os.path.join(fs, "thr1")
+    make_tree(root, dirs=32, files=50)
+    subdirs = [Path(root, f"d{i}") for i in range(32)]
+    paths = list(Path(root).rglob("*.txt"))
+    for func, items in [(walk, subdirs), (stat_all, paths)]:
+        counts = {throughput(func, items, w, repeat=1)[0] for w in [1, 2, 4, 8]}
+        assert counts == {len(paths)}
+    shutil.rmtree(root)
+
+
+@mark.skipif(not free_threaded, reason="threads do not scale with the GIL")
+@mark.skipif((os.cpu_count() or 1) < 4, reason="needs at least 4 CPUs")
+def test_benchmark_walk_and_stat_throughput_should_scale(fs):
+    root = os.path.join(fs, "thr1")
+    make_tree(root, dirs=32, files=50)
+    subdirs = [Path(root, f"d{i}") for i in range(32)] * 4
+    paths = list(Path(root).rglob("*.txt")) * 20
+    for func, items in [(walk, subdirs), (stat_all, paths)]:
+        _, single = throughput(func, items, 1)
+        _, parallel = throughput(func, items, 4)
+        assert parallel > 1.5 * single
+    shutil.rmtree(root)